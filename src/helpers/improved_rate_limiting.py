@@ -1,5 +1,6 @@
 import time
 import os
+import random
 from threading import Lock
 from functools import wraps
 from gspread.exceptions import APIError
@@ -47,6 +48,13 @@ def global_rate_limit(min_interval=5.0, calls_per_minute=15):
         return wrapper
     return decorator
 
+def _retry_after_seconds(e) -> float:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float((headers.get("Retry-After") or "").strip())
+    except (TypeError, ValueError):
+        return 0.0
+
 def never_fail_api_call(func, operation_name="API operation"):
     attempt = 0
     base_delay = 10.0
@@ -62,8 +70,11 @@ def never_fail_api_call(func, operation_name="API operation"):
             
             # Handle quota exceeded errors
             if status_code == 429 or "quota exceeded" in error_msg or "rate limit" in error_msg:
-                # Progressive delays: 1min, 2min, 5min, 10min, 15min, 30min, then stay at 30min
-                if "per minute" in error_msg:
+                # Honor Retry-After when Google sends one, otherwise use progressive delays
+                retry_after = _retry_after_seconds(e)
+                if retry_after > 0:
+                    wait_time = min(max_delay, retry_after)
+                elif "per minute" in error_msg:
                     wait_time = min(max_delay, 60 + (attempt * 60))  # 1, 2, 3... up to 30 min
                 elif "per day" in error_msg:
                     wait_time = max_delay  # Wait 30 minutes for daily quota
@@ -85,8 +96,9 @@ def never_fail_api_call(func, operation_name="API operation"):
                 
             # Handle server errors
             elif status_code in (500, 502, 503, 504):
-                wait_time = min(60, 5 * attempt)  # Up to 1 minute for server errors
-                log(f"{operation_name} server error (attempt {attempt}), waiting {wait_time}s: {e}")
+                # Exponential backoff with jitter, capped at 30s (before jitter)
+                wait_time = min(30, 2 ** attempt) * (1 + random.uniform(0, 0.5))
+                log(f"{operation_name} server error (attempt {attempt}), waiting {wait_time:.1f}s: {e}")
                 time.sleep(wait_time)
                 continue
             else:
@@ -111,6 +123,13 @@ def safe_get_all_values(worksheet, operation_name="reading data"):
         f"{operation_name} from {worksheet.title}"
     )
 
+@global_rate_limit(min_interval=6.0, calls_per_minute=12)
+def safe_values_batch_get(spreadsheet, ranges, operation_name="batch reading ranges"):
+    return never_fail_api_call(
+        lambda: spreadsheet.values_batch_get(ranges),
+        f"{operation_name} ({len(ranges)} ranges)"
+    )
+
 @global_rate_limit(min_interval=8.0, calls_per_minute=10)
 def safe_update_range(worksheet, range_name, values, value_input_option="USER_ENTERED"):
     return never_fail_api_call(
@@ -132,6 +151,13 @@ def safe_append_rows(worksheet, values, value_input_option="USER_ENTERED"):
         f"appending {len(values)} rows to {worksheet.title}"
     )
 
+@global_rate_limit(min_interval=8.0, calls_per_minute=10)
+def safe_add_rows(worksheet, rows):
+    return never_fail_api_call(
+        lambda: worksheet.add_rows(rows),
+        f"adding {rows} rows to {worksheet.title}"
+    )
+
 @global_rate_limit(min_interval=5.0, calls_per_minute=15)
 def safe_get_worksheet(spreadsheet, name):
     return never_fail_api_call(
@@ -152,6 +152,7 @@ if __name__ == "__main__":
             game_name="Puzzler",
             fetch_all=True
         )
+        mail.invalidate_submissions_state()
         
         log("📊 Email fetching complete. Waiting 5 minutes before data processing...")
         for i in range(300):
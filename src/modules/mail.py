@@ -1,14 +1,19 @@
 import os
 import re
 import time
-import base64
+import pybase64
 import gspread
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import zip_longest
 from email.utils import parseaddr
 from dateutil import parser as dtparser
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 
 from googleapiclient.discovery import build
+from selectolax.lexbor import LexborHTMLParser
 from modules.first_names import normalize_first_name
 from modules.last_names import normalize_last_initial
 from modules.logging_utils import log
@@ -17,22 +22,70 @@ from helpers.sheets_client import get_sheet_and_ws
 from modules.auth import get_credentials
 
 from helpers.improved_rate_limiting import (
-    safe_get_all_values, safe_update_range, safe_append_rows, 
-    safe_batch_update, safe_get_worksheet, safe_row_values,
-    safe_get_range, wait_for_quota_reset
+    safe_get_all_values, safe_update_range, safe_add_rows,
+    safe_batch_update, safe_get_worksheet, safe_get_range,
+    wait_for_quota_reset
 )
 
-client, sheet, ws = get_sheet_and_ws()
-
-def _safe_row_values(ws, row):
-    return safe_row_values(ws, row)
+@lru_cache(maxsize=1)
+def _sheet():
+    # Opened on first use so importing this module (e.g. for list_labels) costs no Sheets auth
+    _, sheet, _ = get_sheet_and_ws()
+    return sheet
 
 def _safe_get_all_values_mail(ws):
     return safe_get_all_values(ws, "reading submission data")
 
 _TS_FMT = "%m/%d/%Y %I:%M %p"
+_NY_TZ = ZoneInfo("America/New_York")
+
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_NBSP_TABLE = str.maketrans({"\xa0": " "})
+# Line boundaries recognised by str.splitlines()
+_LINE_BREAKS = r"\n\r\v\f\x1c-\x1e\x85\u2028\u2029"
+# The first line of the text, if it is a "Subject: ..." line
+_SUBJECT_LINE_RE = re.compile(
+    rf"\A[^\S{_LINE_BREAKS}]*subject[^\S{_LINE_BREAKS}]*:[^{_LINE_BREAKS}]*",
+    re.IGNORECASE,
+)
+
+_QUOTES_RE = re.compile(r"[\"']")
+_REPLY_PREFIX_RE = re.compile(r"^(re|fw|fwd):\s*", re.IGNORECASE)
+_ANSWER_RE = re.compile(r"\banswer[:\-\s]+(.+)$", re.IGNORECASE)
+
+# Upper bound on rows/ranges sent in a single Sheets write
+_MAX_BATCH = 100
+# Spare rows added when the Submissions grid is full, so growth is rare
+_ROW_GROWTH = 500
+
+# Gmail allows 50 calls per batch request; stay lower to avoid per-user concurrency errors
+_GMAIL_BATCH_SIZE = 25
+_LIST_PAGE_SIZE = 500  # Gmail's maximum for messages.list
+_META_HEADERS = ["Subject", "From", "Reply-To", "Date"]
+_META_FIELDS = "id,snippet,internalDate,payload/headers"
+
+_MSG_LINK_PREFIX = "https://mail.google.com/mail/u/0/#all/"
+
+# Dedupe state left by the previous label pass in this process, keyed by worksheet title.
+# Checked against the sheet's tail before reuse; main.py drops it after the last pass.
+_submissions_state = {}
+
+# Lines that mark the end of the answer (signatures, reply quotes, list footers)
+_CUT_RE = re.compile(
+    r"^[^\S\n]*(?:"
+    r"Sent from my iPhone.*"
+    r"|Sent from Yahoo Mail.*"
+    r"|Get Outlook for.*"
+    r"|On .+ wrote:"
+    r"|From: .+"
+    r"|—"
+    r"|This message is being sent to you because you are a moderator of the group.*"
+    r")[^\S\n]*$",
+    re.IGNORECASE | re.MULTILINE,
+)
 
 
+@lru_cache(maxsize=512)
 def _col_letter(n: int) -> str:
     s = ""
     while n > 0:
@@ -41,58 +94,86 @@ def _col_letter(n: int) -> str:
     return s
 
 
+def _decode_body(data: str) -> str:
+    if not data:
+        return ""
+    # Gmail may omit '=' padding, which older pybase64 releases require
+    data += "=" * (-len(data) % 4)
+    return pybase64.urlsafe_b64decode(data).decode("utf-8", errors="ignore").strip()
+
+
+def _html_to_text(html: str) -> str:
+    if "<" not in html and "&" not in html:
+        # nothing to parse (also covers empty bodies); match the parser's newline handling
+        text = html.replace("\r\n", "\n").replace("\r", "\n")
+        return _BLANK_LINES_RE.sub("\n\n", text).strip()
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(["script", "style"])
+    for node in tree.css("br"):
+        node.replace_with("\n")
+    for node in tree.css("p"):
+        node.insert_after("\n")
+    text = tree.text(separator="")
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
 def _extract_plaintext(payload):
     """
     Recursively extract the best text/plain body from a Gmail payload.
-    Fallbacks: text/html stripped tags to plain text; final fallback: empty string.
+    Within a multipart/alternative a non-blank text/plain sibling wins, so the HTML
+    alternative is never decoded. Otherwise the first part that yields text is used.
     """
-    def html_to_text(html):
-        # minimal HTML to text
-        text = re.sub(r"(?is)<(script|style).*?>.*?</\1>", "", html)
-        text = re.sub(r"(?is)<br\s*/?>", "\n", text)
-        text = re.sub(r"(?is)</p>", "\n", text)
-        text = re.sub(r"(?is)<.*?>", "", text)
-        return re.sub(r"\n{3,}", "\n\n", text).strip()
-
     mt = payload.get("mimeType")
+    data = payload.get("body", {}).get("data", "")
 
     if mt == "text/plain":
-        data = payload.get("body", {}).get("data", "")
-        return base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore").strip() if data else ""
+        return _decode_body(data)
 
     if mt == "text/html":
-        data = payload.get("body", {}).get("data", "")
-        html = base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore").strip() if data else ""
-        return html_to_text(html)
-
-    # Walk parts recursively
-    for part in (payload.get("parts", []) or []):
+        return _html_to_text(_decode_body(data))
+
+    parts = payload.get("parts", []) or []
+    alternative = mt == "multipart/alternative"
+
+    if alternative:
+        # Blank plain parts (often just CRLF) fall through to the HTML alternative
+        for part in parts:
+            if part.get("mimeType") == "text/plain":
+                txt = _decode_body(part.get("body", {}).get("data", ""))
+                if txt:
+                    return txt
+
+    for part in parts:
+        if alternative and part.get("mimeType") == "text/plain":
+            continue
         txt = _extract_plaintext(part)
         if txt:
             return txt
 
-    data = payload.get("body", {}).get("data", "")
-    if data:
-        return base64.urlsafe_b64decode(data).decode("utf-8", errors="ignore").strip()
-    return ""
+    return _decode_body(data)
 
 
 def _parse_date_to_string(date_header: str) -> str:
     dt = dtparser.parse(date_header)
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
-    dt_local = dt.astimezone(ZoneInfo("America/New_York"))
+    dt_local = dt.astimezone(_NY_TZ)
     return dt_local.strftime(_TS_FMT)
 
 
 def _normalize_ts_str(s: str) -> str:
     if not s:
         return ""
+    try:
+        # Rows we wrote ourselves are already in _TS_FMT; strptime is far cheaper than dateutil
+        return datetime.strptime(s, _TS_FMT).strftime(_TS_FMT)
+    except ValueError:
+        pass
     try:
         dt = dtparser.parse(s)
         if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=ZoneInfo("America/New_York"))
-        return dt.astimezone(ZoneInfo("America/New_York")).strftime(_TS_FMT)
+            dt = dt.replace(tzinfo=_NY_TZ)
+        return dt.astimezone(_NY_TZ).strftime(_TS_FMT)
     except Exception:
         return (s or "").strip()
 
@@ -100,15 +181,12 @@ def _normalize_ts_str(s: str) -> str:
 def _normalize_answer_for_key(s: str) -> str:
     if not s:
         return ""
-    s = s.replace("\xa0", " ")
+    s = s.translate(_NBSP_TABLE)
     # drop leading "Subject: ..." line, if present, for stable dedupe
-    lines = s.splitlines()
-    if lines and re.match(r"(?i)^\s*subject\s*:", lines[0]):
-        lines = lines[1:]
-    s = "\n".join(lines)
-    s = re.sub(r"\s+", " ", s).strip().lower()
-    return s
+    s = _SUBJECT_LINE_RE.sub("", s, count=1)
+    return " ".join(s.split()).lower()
 
+@lru_cache(maxsize=4096)
 def _pick_personal_sender(from_header: str, reply_to_header: str, list_aliases=None):
     """
     Prefer the personal sender in Reply-To when the message arrived via a
@@ -116,7 +194,7 @@ def _pick_personal_sender(from_header: str, reply_to_header: str, list_aliases=N
     Falls back to From if Reply-To is unusable.
     """
     if list_aliases is None:
-        list_aliases = {"riddler@spotlightpa.org", "scrambler@spotlightpa.org"}
+        list_aliases = frozenset({"riddler@spotlightpa.org", "scrambler@spotlightpa.org"})
 
     from_name, from_email = parseaddr(from_header or "")
     rt_name, rt_email = parseaddr(reply_to_header or "")
@@ -144,13 +222,14 @@ def _pick_personal_sender(from_header: str, reply_to_header: str, list_aliases=N
     return from_name or from_email, from_email or rt_email
 
 
+@lru_cache(maxsize=4096)
 def _parse_sender(from_header: str, reply_to_header: str = ""):
     # Prefer a real person over a list alias when possible
     chosen_name, chosen_email = _pick_personal_sender(from_header, reply_to_header)
 
     # Derive display names
-    name_clean = re.sub(r"[\"']", "", (chosen_name or "")).strip()
-    parts = [p for p in re.split(r"\s+", name_clean) if p]
+    name_clean = _QUOTES_RE.sub("", (chosen_name or "")).strip()
+    parts = name_clean.split()
 
     first = normalize_first_name(parts[0]) if parts else ""
     last_initial = normalize_last_initial(parts[1] if len(parts) > 1 else "")
@@ -166,24 +245,12 @@ def _clean_answer(body_text: str) -> str:
     if not body_text:
         return ""
 
+    # Gmail text/plain parts use CRLF; store answers with plain \n line breaks
+    body_text = "\n".join(body_text.splitlines())
+
     # Drop everything after common mobile signatures or reply quotes
-    cut_patterns = [
-        r"^Sent from my iPhone.*$",
-        r"^Sent from Yahoo Mail.*$",
-        r"^Get Outlook for.*$",
-        r"^On .+ wrote:$",
-        r"^From: .+$",
-        r"^—$",
-        r"^-- $",
-        r"^This message is being sent to you because you are a moderator of the group.*$",
-    ]
-    lines = body_text.splitlines()
-    out = []
-    for ln in lines:
-        if any(re.search(pat, ln.strip(), flags=re.IGNORECASE) for pat in cut_patterns):
-            break
-        out.append(ln)
-    cleaned = "\n".join(out).strip()
+    m = _CUT_RE.search(body_text)
+    cleaned = (body_text[:m.start()] if m else body_text).strip()
 
     # If it's overly long, truncate to first 3000 chars to be safe
     if len(cleaned) > 3000:
@@ -203,28 +270,29 @@ def _looks_like_digest_or_moderator(subject: str, from_email: str, body_text: st
     return False
 
 
-def _ensure_submission_headers(ws_sub):
-    headers = _safe_row_values(ws_sub, 1)
+def _norm_header(h: str) -> str:
+    return " ".join((h or "").lower().split())
+
+
+def _ensure_submission_headers(ws_sub, headers):
+    headers = list(headers)
     needed = [
         "Game", "Timestamp", "First Name", "Last Name Initial",
         "Email", "Answer", "AI Grade", "AI Confidence", "Override", "Link"
     ]
-    norm_existing = {re.sub(r"\s+", " ", (h or "").strip().lower()): i for i, h in enumerate(headers)}
+    norm_existing = {_norm_header(h): i for i, h in enumerate(headers)}
     changed = False
 
     for col in needed[:-1]:
-        if re.sub(r"\s+", " ", col.lower()) not in norm_existing:
+        norm = _norm_header(col)
+        if norm not in norm_existing:
             headers.append(col)
-            norm_existing[re.sub(r"\s+", " ", col.lower())] = len(headers) - 1
+            norm_existing[norm] = len(headers) - 1
             changed = True
 
-    norm_override = re.sub(r"\s+", " ", "Override".lower())
-    norm_link = re.sub(r"\s+", " ", "Link".lower())
-    if norm_link not in norm_existing:
-        override_idx = norm_existing.get(norm_override, len(headers) - 1)
-        insert_at = override_idx + 1
-        headers.insert(insert_at, "Link")
-        norm_existing = {re.sub(r"\s+", " ", (h or "").strip().lower()): i for i, h in enumerate(headers)}
+    if "link" not in norm_existing:
+        override_idx = norm_existing.get("override", len(headers) - 1)
+        headers.insert(override_idx + 1, "Link")
         changed = True
 
     if changed:
@@ -232,34 +300,60 @@ def _ensure_submission_headers(ws_sub):
     return headers
 
 
-def _load_existing_keys(ws_sub, headers):
-    all_rows = _safe_get_all_values_mail(ws_sub)
+def _load_existing_keys(all_rows, link_col_idx):
     keys = set()
     key_to_row = {}
+    key_to_link = {}
+    linked_msgs = set()
+    triple_counts = Counter()
+    ts_cache = {}
+    ans_cache = {}
     for row_idx, r in enumerate(all_rows[2:], start=3):
-        game = (r[0] if len(r) > 0 else "").strip().lower()
-        ts_raw = (r[1] if len(r) > 1 else "").strip()
-        email = (r[4] if len(r) > 4 else "").strip().lower()
-        ans_raw = (r[5] if len(r) > 5 else "").strip()
-
-        ts_norm = _normalize_ts_str(ts_raw)
-        ans_norm = _normalize_answer_for_key(ans_raw)
-
-        if game and ts_norm and email and ans_norm:
+        game, ts_raw, _, _, email, ans_raw = (r + [""] * 6)[:6]
+        game = game.strip().lower()
+        link_raw = (r[link_col_idx] if len(r) > link_col_idx else "").strip()
+        if link_raw.startswith(_MSG_LINK_PREFIX):
+            # A message labelled for several games gets a row per game
+            linked_msgs.add((game, link_raw[len(_MSG_LINK_PREFIX):]))
+
+        # Rows that can't form a key skip the (costlier) normalization below
+        email = email.strip().lower()
+        if not game or not email:
+            continue
+        ts_raw = ts_raw.strip()
+        ans_raw = ans_raw.strip()
+
+        ts_norm = ts_cache.get(ts_raw)
+        if ts_norm is None:
+            ts_norm = ts_cache[ts_raw] = _normalize_ts_str(ts_raw)
+        ans_norm = ans_cache.get(ans_raw)
+        if ans_norm is None:
+            ans_norm = ans_cache[ans_raw] = _normalize_answer_for_key(ans_raw)
+
+        if ts_norm and ans_norm:
             k = (game, email, ts_norm, ans_norm)
             keys.add(k)
             key_to_row[k] = row_idx
-    return keys, key_to_row
+            key_to_link[k] = link_raw
+            triple_counts[k[:3]] += 1
+    return keys, key_to_row, key_to_link, linked_msgs, triple_counts
+
+
+def invalidate_submissions_state():
+    _submissions_state.clear()
 
 
-def _next_empty_row(ws_sub, num_cols: int):
-    last = 0
-    last_col_letter = _col_letter(num_cols)
-    data = safe_get_range(ws_sub, f"A:{last_col_letter}")
-    for i, row in enumerate(data, start=1):
-        if any((cell or "").strip() for cell in row):
-            last = i
-    return max(last + 1, 3)
+def _state_matches_sheet(ws_sub, next_row: int) -> bool:
+    """
+    Cheap end-of-table check for carried-over state: the last row we know of must
+    still hold data and nothing may have been added below it since.
+    """
+    first = max(next_row - 1, 3)
+    tail = safe_get_range(ws_sub, f"{first}:{max(first, ws_sub.row_count)}")
+    if next_row <= 3:
+        return not tail
+    return len(tail) == 1 and any((c or "").strip() for c in tail[0])
+
 
 def list_labels():
     creds = get_credentials()
@@ -279,19 +373,24 @@ def list_labels():
             label_name = public_label_ids[label_id]
             log(f"Label - Name: {label['name']} | ID: {label_id}")
 
+@lru_cache(maxsize=32)
+def _game_answer_re(game: str):
+    return re.compile(rf"\b{re.escape(game)}\s*answer[:\-\s]*(.+)$", re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
 def _extract_answer_from_subject(subject: str, game_name: str) -> str:
     if not subject:
         return ""
     s = subject.strip()
-    s = re.sub(r"(?i)^(re|fw|fwd):\s*", "", s).strip()
+    s = _REPLY_PREFIX_RE.sub("", s).strip()
 
     g = (game_name or "").strip()
     if g:
-        m = re.search(rf"(?i)\b{re.escape(g)}\s*answer[:\-\s]*(.+)$", s)
+        m = _game_answer_re(g).search(s)
         if m:
             return m.group(1).strip(" '\"—–-").strip()
 
-    m = re.search(r"(?i)\banswer[:\-\s]+(.+)$", s)
+    m = _ANSWER_RE.search(s)
     if m:
         return m.group(1).strip(" '\"—–-").strip()
 
@@ -300,6 +399,101 @@ def _extract_answer_from_subject(subject: str, game_name: str) -> str:
 
     return ""
 
+def _chunked(seq, n: int):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+def _flush_submission_writes(ws_sub, rows_to_append, link_updates, link_col_idx: int, next_row: int, game_name: str) -> int:
+    """
+    Write new rows starting at next_row together with any Link backfills,
+    one values.batchUpdate per chunk instead of separate append and update calls.
+    """
+    last_row = next_row + len(rows_to_append) - 1
+    if rows_to_append and last_row > ws_sub.row_count:
+        # Range writes don't grow the grid the way appends do
+        safe_add_rows(ws_sub, last_row - ws_sub.row_count + _ROW_GROWTH)
+
+    link_col_letter = _col_letter(link_col_idx + 1)
+    row_chunks = _chunked(rows_to_append, _MAX_BATCH)
+    link_chunks = _chunked(link_updates, _MAX_BATCH)
+    for rows, links in zip_longest(row_chunks, link_chunks, fillvalue=()):
+        data = []
+        if rows:
+            end_row = next_row + len(rows) - 1
+            data.append({"range": f"A{next_row}:{_col_letter(len(rows[0]))}{end_row}", "values": rows})
+            next_row = end_row + 1
+        for row_idx, link in links:
+            data.append({"range": f"{link_col_letter}{row_idx}:{link_col_letter}{row_idx}", "values": [[link]]})
+
+        safe_batch_update(ws_sub, data)
+        if rows:
+            log(f"Successfully appended {len(rows)} {game_name} rows.")
+        if links:
+            log(f"Backfilled {len(links)} link(s) successfully.")
+
+    return len(rows_to_append)
+
+def _batch_get_messages(service, msg_ids, **params):
+    """
+    Fetch messages with Gmail batch requests and return {msg_id: message}.
+    Failed ids are retried until every message has been fetched.
+    """
+    results = {}
+    pending = list(msg_ids)
+    attempt = 0
+    while pending:
+        errors = {}
+
+        def on_response(request_id, response, exception):
+            if exception is not None:
+                errors[request_id] = exception
+            else:
+                results[request_id] = response
+
+        for chunk in _chunked(pending, _GMAIL_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=on_response)
+            for msg_id in chunk:
+                batch.add(service.users().messages().get(userId="me", id=msg_id, **params), request_id=msg_id)
+            try:
+                time.sleep(1.5)
+                batch.execute()
+            except Exception as e:
+                for msg_id in chunk:
+                    if msg_id not in results:
+                        errors[msg_id] = e
+
+        pending = [msg_id for msg_id in pending if msg_id not in results]
+        if pending:
+            attempt += 1
+            err = next(iter(errors.values()), None)
+            wait_time = min(120, 10 * attempt)
+            if "quota" in str(err).lower():
+                wait_time = min(600, 60 * attempt)
+            log(f"Gmail batch fetch error (attempt {attempt}) for {len(pending)} message(s), waiting {wait_time}s: {err}")
+            time.sleep(wait_time)
+    return results
+
+def _list_messages_page(service, label_id: str, page_token=None):
+    req = {
+        "userId": "me",
+        "labelIds": [label_id],
+        "maxResults": _LIST_PAGE_SIZE,
+        "fields": "messages/id,nextPageToken",
+    }
+    if page_token:
+        req["pageToken"] = page_token
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            time.sleep(2.0)
+            return service.users().messages().list(**req).execute()
+        except Exception as e:
+            wait_time = min(300, 30 * attempt)  # Up to 5 minutes between Gmail retries
+            log(f"Gmail API error (attempt {attempt}), waiting {wait_time}s: {e}")
+            time.sleep(wait_time)
+
 def fetch_emails_for_label(label_id_env: str, game_name: str, fetch_all: bool = True):
     log(f"Starting email fetch for {game_name}...")
     
@@ -314,171 +508,204 @@ def fetch_emails_for_label(label_id_env: str, game_name: str, fetch_all: bool =
     creds = get_credentials()
     service = build("gmail", "v1", credentials=creds)
 
-    ws_sub = safe_get_worksheet(sheet, "Submissions")
-
-    try:
-        all_values = safe_get_all_values(ws_sub, f"checking {game_name} worksheet size")
-        log(f"Writing to worksheet: {ws_sub.title} (rows before: {len(all_values)})")
-    except Exception as e:
-        log(f"Could not get initial row count: {e}")
-
-    headers = _ensure_submission_headers(ws_sub)
-    existing_keys, key_to_row = _load_existing_keys(ws_sub, headers)
-
-    header_map = {h.strip(): i for i, h in enumerate(headers)}
-    link_col_idx = header_map.get("Link", len(headers) - 1)
-
-    page_token = None
+    ws_sub = safe_get_worksheet(_sheet(), "Submissions")
+
+    # Taken out up front so a pass that dies midway leaves no stale state behind
+    state = _submissions_state.pop(ws_sub.title, None)
+    if state and not _state_matches_sheet(ws_sub, state[-1]):
+        log(f"{ws_sub.title} changed since the previous pass; re-reading it")
+        state = None
+    if state:
+        headers, link_col_idx, existing_keys, key_to_row, key_to_link, linked_msgs, triple_counts, next_row = state
+        log(f"Writing to worksheet: {ws_sub.title} (reusing state from previous pass, next row: {next_row})")
+    else:
+        # One read serves the header check, the dedupe keys and the row count
+        all_rows = _safe_get_all_values_mail(ws_sub)
+        log(f"Writing to worksheet: {ws_sub.title} (rows before: {len(all_rows)})")
+
+        # get_all_values pads every row to the widest one; row_values(1) never did
+        hdr = list(all_rows[0]) if all_rows else []
+        while hdr and not hdr[-1].strip():
+            hdr.pop()
+        headers = _ensure_submission_headers(ws_sub, hdr)
+        header_map = {h.strip(): i for i, h in enumerate(headers)}
+        link_col_idx = header_map.get("Link", len(headers) - 1)
+
+        existing_keys, key_to_row, key_to_link, linked_msgs, triple_counts = _load_existing_keys(
+            all_rows, link_col_idx
+        )
+
+        # get_all_values stops at the last non-empty row; data starts on row 3
+        next_row = max(len(all_rows) + 1, 3)
+
+    # Sheet timestamps stop at the minute; a triple shared with any other row needs the answer to match
+    unlinked_keys = {k[:3]: k for k, link in key_to_link.items() if not link and triple_counts[k[:3]] == 1}
+    game_key = game_name.strip().lower()
     pulled_total = 0
     page_num = 0
+    rows_to_append = []
+    link_updates = []
 
     log(f"Starting Gmail API fetch for {game_name} (this may take some time)...")
 
-    while True:
-        page_num += 1
-        req = {"userId": "me", "labelIds": [label_id], "maxResults": 50}
-        if page_token:
-            req["pageToken"] = page_token
+    # The Gmail client is not thread-safe, so the prefetch thread gets its own
+    with ThreadPoolExecutor(max_workers=1) as list_pool:
+        list_service = build("gmail", "v1", credentials=creds)
+        next_page = list_pool.submit(_list_messages_page, list_service, label_id, None)
 
-        attempt = 0
         while True:
-            attempt += 1
-            try:
-                time.sleep(2.0)
-                results = service.users().messages().list(**req).execute()
+            page_num += 1
+            results = next_page.result()
+            messages = results.get("messages", [])
+            page_token = results.get("nextPageToken")
+
+            if not messages:
                 break
-            except Exception as e:
-                wait_time = min(300, 30 * attempt)  # Up to 5 minutes between Gmail retries
-                log(f"Gmail API error (attempt {attempt}), waiting {wait_time}s: {e}")
-                time.sleep(wait_time)
-                
-        messages = results.get("messages", [])
-        page_token = results.get("nextPageToken")
 
-        if not messages:
-            break
+            # Start listing the next page while this one is processed
+            if fetch_all and page_token:
+                next_page = list_pool.submit(_list_messages_page, list_service, label_id, page_token)
 
-        rows_to_append = []
-        link_updates = []
+            log(f"Processing page {page_num} with {len(messages)} messages...")
 
-        log(f"Processing page {page_num} with {len(messages)} messages...")
+            # Messages already linked from a row for this game were imported on an earlier run
+            msg_ids = [m["id"] for m in messages if m.get("id") and (game_key, m["id"]) not in linked_msgs]
 
-        for msg_idx, msg in enumerate(messages, 1):
-            msg_id = msg.get("id")
-            if not msg_id:
-                continue
+            # Phase 1: small metadata responses settle legacy duplicates and body-less mail
+            metas = _batch_get_messages(
+                service, msg_ids, format="metadata", metadataHeaders=_META_HEADERS, fields=_META_FIELDS
+            ) if msg_ids else {}
 
-            attempt = 0
-            while True:
-                attempt += 1
-                try:
-                    time.sleep(1.5)
-                    message = service.users().messages().get(userId="me", id=msg_id, format="full").execute()
-                    break
-                except Exception as e:
-                    wait_time = min(120, 10 * attempt)
-                    log(f"Gmail message fetch error (attempt {attempt}) for message {msg_idx}/{len(messages)}: {e}")
-                    if "quota" in str(e).lower():
-                        wait_time = min(600, 60 * attempt)
-                    time.sleep(wait_time)
-
-            payload = message.get("payload", {})
-            headers_data = payload.get("headers", [])
-
-            def hget(name, default=""):
-                return next((h["value"] for h in headers_data if h["name"].lower() == name.lower()), default)
-
-            subject = hget("Subject", "")
-            from_header = hget("From", "")
-            reply_to_header = hget("Reply-To", "")
-            date_header = hget("Date", "")
-            internal_ms = message.get("internalDate")
+            parsed = []
+            for msg_id in msg_ids:
+                message = metas.get(msg_id)
+                if not message:
+                    continue
 
-            try:
-                if internal_ms:
-                    dt = datetime.fromtimestamp(int(internal_ms) / 1000, tz=timezone.utc)
-                    ts_str = dt.astimezone(ZoneInfo("America/New_York")).strftime(_TS_FMT)
-                else:
-                    ts_str = _parse_date_to_string(date_header) if date_header else ""
-            except Exception:
-                log(f"Skipping message {msg_id}: unparseable Date/internalDate")
-                continue
-
-            first_name, last_initial, email_addr = _parse_sender(from_header, reply_to_header)
-            body_text = _extract_plaintext(payload)
-            body_text = _clean_answer(body_text)
-
-            if _looks_like_digest_or_moderator(subject, email_addr, body_text):
-                continue
-
-            subj_clean = (subject or "").strip()
-            if not body_text and subj_clean:
-                guess = _extract_answer_from_subject(subj_clean, game_name)
-                if guess:
-                    body_text = f"Subject: {subj_clean}\n\n{guess}"
-                else:
-                    body_text = f"Subject: {subj_clean}"
-            elif subj_clean and body_text:
-                body_text = f"Subject: {subj_clean}\n\n{body_text}"
-
-            ans_for_key = _normalize_answer_for_key(body_text)
-            if not ans_for_key:
-                continue
-
-            msg_link = f"https://mail.google.com/mail/u/0/#all/{msg_id}"
-
-            key = (game_name.strip().lower(), (email_addr or "").strip().lower(), ts_str, ans_for_key)
-            if key in existing_keys:
-                row_idx = key_to_row.get(key)
-                if row_idx:
-                    try:
-                        curr = safe_get_range(ws_sub, f"{_col_letter(link_col_idx+1)}{row_idx}:{_col_letter(link_col_idx+1)}{row_idx}")
-                        curr_val = curr[0][0] if curr and curr[0] else ""
-                    except Exception:
-                        curr_val = ""
-                    if not curr_val:
+                hmap = {}
+                for h in message.get("payload", {}).get("headers", []):
+                    # keep the first occurrence of a repeated header
+                    hmap.setdefault(h["name"].lower(), h["value"])
+
+                subject = hmap.get("subject", "")
+                from_header = hmap.get("from", "")
+                reply_to_header = hmap.get("reply-to", "")
+                date_header = hmap.get("date", "")
+                internal_ms = message.get("internalDate")
+
+                try:
+                    if internal_ms:
+                        dt = datetime.fromtimestamp(int(internal_ms) / 1000, tz=timezone.utc)
+                        ts_str = dt.astimezone(_NY_TZ).strftime(_TS_FMT)
+                    else:
+                        ts_str = _parse_date_to_string(date_header) if date_header else ""
+                except Exception:
+                    log(f"Skipping message {msg_id}: unparseable Date/internalDate")
+                    continue
+
+                first_name, last_initial, email_addr = _parse_sender(from_header, reply_to_header)
+                msg_link = f"{_MSG_LINK_PREFIX}{msg_id}"
+                triple = (game_key, (email_addr or "").strip().lower(), ts_str)
+                parsed.append((msg_id, msg_link, subject, ts_str, first_name, last_initial, email_addr,
+                               bool(message.get("snippet")), triple))
+
+            # Two messages in the same minute can only be told apart by their bodies
+            page_triples = Counter(p[-1] for p in parsed)
+
+            candidates = []
+            for msg_id, msg_link, subject, ts_str, first_name, last_initial, email_addr, has_body, triple in parsed:
+                # Rows imported before links were recorded are matched without the answer
+                legacy_key = unlinked_keys.pop(triple, None) if page_triples[triple] == 1 else None
+                if legacy_key:
+                    link_updates.append((key_to_row[legacy_key], msg_link))
+                    key_to_link[legacy_key] = msg_link
+                    linked_msgs.add((game_key, msg_id))
+                    continue
+
+                # Subject/sender alone identify most digests; don't pay for their bodies
+                if _looks_like_digest_or_moderator(subject, email_addr, ""):
+                    continue
+
+                candidates.append((msg_id, msg_link, subject, ts_str, first_name, last_initial, email_addr, has_body))
+
+            # Phase 2: full payloads only for the messages that still need their body
+            need_full = [c[0] for c in candidates if c[-1]]
+            fulls = _batch_get_messages(service, need_full, format="full") if need_full else {}
+
+            for msg_id, msg_link, subject, ts_str, first_name, last_initial, email_addr, has_body in candidates:
+                body_text = ""
+                if has_body:
+                    message = fulls.get(msg_id)
+                    if not message:
+                        continue
+                    body_text = _clean_answer(_extract_plaintext(message.get("payload", {})))
+
+                # Moderator approval requests are only recognizable by their body
+                if _looks_like_digest_or_moderator(subject, email_addr, body_text):
+                    continue
+
+                subj_clean = (subject or "").strip()
+                if not body_text and subj_clean:
+                    guess = _extract_answer_from_subject(subj_clean, game_name)
+                    if guess:
+                        body_text = f"Subject: {subj_clean}\n\n{guess}"
+                    else:
+                        body_text = f"Subject: {subj_clean}"
+                elif subj_clean and body_text:
+                    body_text = f"Subject: {subj_clean}\n\n{body_text}"
+
+                ans_for_key = _normalize_answer_for_key(body_text)
+                if not ans_for_key:
+                    continue
+
+                key = (game_key, (email_addr or "").strip().lower(), ts_str, ans_for_key)
+                if key in existing_keys:
+                    row_idx = key_to_row.get(key)
+                    if row_idx and not key_to_link.get(key):
                         link_updates.append((row_idx, msg_link))
-                continue
-
-            new_row_values = {
-                "Game": game_name,
-                "Timestamp": ts_str,
-                "First Name": first_name,
-                "Last Name Initial": last_initial,
-                "Email": email_addr,
-                "Answer": body_text,
-                "AI Grade": "",
-                "AI Confidence": "",
-                "Override": "",
-                "Link": msg_link,
-            }
-            row = [new_row_values.get(h, "") for h in headers]
-            rows_to_append.append(row)
-
-            existing_keys.add(key)
-
-        if rows_to_append:
-            safe_append_rows(ws_sub, rows_to_append)
-            pulled_total += len(rows_to_append)
-            log(f"Successfully appended {len(rows_to_append)} {game_name} rows.")
-
-        if link_updates:
-            requests = []
-            link_col_letter = _col_letter(link_col_idx + 1)
-            for row_idx, link in link_updates:
-                requests.append({
-                    "range": f"{link_col_letter}{row_idx}:{link_col_letter}{row_idx}",
-                    "values": [[link]]
-                })
-            if requests:
-                safe_batch_update(ws_sub, [{"range": r["range"], "values": r["values"]} for r in requests])
-                log(f"Backfilled {len(requests)} link(s) successfully.")
-
-        if not fetch_all or not page_token:
-            break
-
-        log(f"Completed page {page_num}, waiting before next page...")
-        time.sleep(10.0)
+                        key_to_link[key] = msg_link
+                        linked_msgs.add((game_key, msg_id))
+                    continue
+
+                new_row_values = {
+                    "Game": game_name,
+                    "Timestamp": ts_str,
+                    "First Name": first_name,
+                    "Last Name Initial": last_initial,
+                    "Email": email_addr,
+                    "Answer": body_text,
+                    "AI Grade": "",
+                    "AI Confidence": "",
+                    "Override": "",
+                    "Link": msg_link,
+                }
+                row = [new_row_values.get(h, "") for h in headers]
+                rows_to_append.append(row)
+
+                existing_keys.add(key)
+                linked_msgs.add((game_key, msg_id))
+
+            if len(rows_to_append) >= _MAX_BATCH or len(link_updates) >= _MAX_BATCH:
+                written = _flush_submission_writes(ws_sub, rows_to_append, link_updates, link_col_idx, next_row, game_name)
+                next_row += written
+                pulled_total += written
+                rows_to_append = []
+                link_updates = []
+
+            if not fetch_all or not page_token:
+                break
+
+            log(f"Completed page {page_num}, waiting before next page...")
+            time.sleep(3.0)
+
+    if rows_to_append or link_updates:
+        written = _flush_submission_writes(ws_sub, rows_to_append, link_updates, link_col_idx, next_row, game_name)
+        next_row += written
+        pulled_total += written
+
+    _submissions_state[ws_sub.title] = (
+        headers, link_col_idx, existing_keys, key_to_row, key_to_link, linked_msgs, triple_counts, next_row
+    )
 
     log(f"Completed! Pulled {pulled_total} {game_name} submission(s) total.")
     
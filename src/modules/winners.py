@@ -1,32 +1,88 @@
 import os
 import time
 import random
+from bisect import bisect_left, bisect_right
 from dateutil import parser
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from gspread.utils import fill_gaps
 
 from modules import grading
 from modules.logging_utils import log
 from helpers.improved_rate_limiting import (
-    safe_get_all_values, safe_update_range
+    safe_values_batch_get, safe_batch_update
 )
 
-def _parse_dt_safe(s: str):
+# Formats Sheets and mail.py write; anything else falls back to dateutil
+_KNOWN_DT_FORMATS = (
+    "%m/%d/%Y %I:%M %p",
+    "%m/%d/%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+)
+
+@lru_cache(maxsize=4096)
+def _parse_dt_cached(s: str):
+    if not s:
+        return None
+    for fmt in _KNOWN_DT_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            pass
     try:
-        return parser.parse(s) if s else None
+        return parser.parse(s)
     except Exception:
         return None
 
+def _parse_dt_safe(s: str):
+    # Timestamps repeat heavily across Games and Submissions; parse each distinct string once
+    return _parse_dt_cached((s or "").strip())
+
+@lru_cache(maxsize=512)
+def _col_letter(n: int) -> str:
+    s = ""
+    while n > 0:
+        n, r = divmod(n - 1, 26)
+        s = chr(65 + r) + s
+    return s
+
+@lru_cache(maxsize=1024)
 def _fmt_dt(dt):
     s = dt.strftime("%m/%d/%Y %I:%M %p")
     return s.replace(" 0", " ", 1)
 
-def _load_previous_winner_emails(sheet):
-    try:
-        prev_ws = sheet.worksheet("Previous Winners")
-        rows = safe_get_all_values(prev_ws, "reading previous winners")
-    except Exception:
-        return set()
-
+@dataclass(slots=True)
+class _Game:
+    game: str
+    game_key: str
+    start_dt: datetime
+    end_dt: datetime
+
+@dataclass(slots=True)
+class _Submission:
+    row: int
+    dt: datetime
+    email: str
+    email_key: str
+    link: str
+    display_name: str
+    name_key: str
+
+def _display_name(first_name: str, last_initial: str) -> str:
+    last_initial = (last_initial or "").strip()
+    if last_initial:
+        return f"{first_name} {last_initial}."
+    return first_name
+
+@lru_cache(maxsize=64)
+def _is_correct(ai_grade: str, override: str) -> bool:
+    # Grades and overrides come from a handful of distinct strings
+    return grading.is_marked_correct({"AI Grade": ai_grade, "Override": override})
+
+def _load_previous_winner_emails(rows):
     if not rows:
         return set()
 
@@ -35,22 +91,29 @@ def _load_previous_winner_emails(sheet):
         return set()
 
     idx = headers.index("Email")
-    emails = set()
-    for r in rows[1:]:
-        if len(r) > idx:
-            e = (r[idx] or "").strip().lower()
-            if e and e not in {"na", "declined"}:
-                emails.add(e)
-    return emails
+    emails = ((r[idx] or "").strip().casefold() for r in rows[1:] if len(r) > idx)
+    return {e for e in emails if e and e not in {"na", "declined"}}
 
 def populate_winners_tab(sheet):
     log("Starting winner population...")
     
-    games_ws = sheet.worksheet("Games")
-    subs_ws = sheet.worksheet("Submissions")
-    winners_ws = sheet.worksheet("Winners")
+    # One metadata call resolves every tab, then a single batchGet reads them all
+    tabs = {ws.title: ws for ws in sheet.worksheets()}
+    missing = [t for t in ("Games", "Submissions", "Winners") if t not in tabs]
+    if missing:
+        log(f"❌ Missing worksheet(s): {', '.join(missing)}")
+        return
+    winners_ws = tabs["Winners"]
+
+    titles = ["Games", "Submissions", "Winners"]
+    if "Previous Winners" in tabs:
+        titles.append("Previous Winners")
+    resp = safe_values_batch_get(sheet, [f"'{t}'" for t in titles], "reading data for winners")
+    # Pad ragged rows the way get_all_values does
+    data = {t: fill_gaps(vr.get("values", [])) for t, vr in zip(titles, resp.get("valueRanges", []))}
+    del resp
 
-    games_raw = safe_get_all_values(games_ws, "reading Games data for winners")
+    games_raw = data.get("Games", [])
     if not games_raw:
         log("❌ Games sheet is empty.")
         return
@@ -63,33 +126,23 @@ def populate_winners_tab(sheet):
         return
 
     games = []
-    for row_num in range(3, len(games_raw) + 1):
-        row = games_raw[row_num - 1]
+    for row in games_raw[2:]:
         if len(row) < len(headers):
             row = row + [""] * (len(headers) - len(row))
 
         gtype = row[h["Game"]].strip()
         start_dt = _parse_dt_safe(row[h["Start Time"]].strip())
         end_dt = _parse_dt_safe(row[h["End Time"]].strip())
-        question = row[h["Question"]].strip()
-        answer = row[h["Answer"]].strip()
 
         if not gtype or not start_dt or not end_dt:
             continue
 
-        games.append({
-            "row": row_num,
-            "game": gtype,
-            "start_dt": start_dt,
-            "end_dt": end_dt,
-            "question": question,
-            "answer": answer,
-        })
+        games.append(_Game(gtype, gtype.casefold(), start_dt, end_dt))
 
     # Deterministic ordering
-    games.sort(key=lambda r: (r["game"].lower(), r["start_dt"]))
+    games.sort(key=lambda r: (r.game_key, r.start_dt))
 
-    subs_raw = safe_get_all_values(subs_ws, "reading Submissions data for winners")
+    subs_raw = data.pop("Submissions", [])
     sub_headers = subs_raw[0] if subs_raw else []
     sh = {name.strip(): idx for idx, name in enumerate(sub_headers)}
     needed_sub_cols = ["Game", "Timestamp", "First Name", "Last Name Initial", "Email", "AI Grade", "Override"]
@@ -98,152 +151,127 @@ def populate_winners_tab(sheet):
         return
 
     link_idx = sh.get("Link")
+    game_i, ts_i, first_i, last_i, email_i, grade_i, override_i = (sh[col] for col in needed_sub_cols)
+    game_keys = {g.game_key for g in games}
 
-    submissions = []
-    for i, row in enumerate(subs_raw[2:], start=3):
+    # Single pass: keep only entries that can ever win, bucketed by game
+    subs_by_game = {}
+    for i, row in enumerate(islice(subs_raw, 2, None), start=3):
         if len(row) < len(sub_headers):
             row = row + [""] * (len(sub_headers) - len(row))
-        gtype = (row[sh["Game"]] or "").strip()
-        ts = _parse_dt_safe((row[sh["Timestamp"]] or "").strip())
-        first_name = (row[sh["First Name"]] or "").strip()
-        last_initial = (row[sh["Last Name Initial"]] or "").strip()
-        email = (row[sh["Email"]] or "").strip()
-        ai_grade = (row[sh["AI Grade"]] or "").strip()
-        override = (row[sh["Override"]] or "").strip()
+        gtype = (row[game_i] or "").strip()
+        first_name = (row[first_i] or "").strip()
+        email = (row[email_i] or "").strip()
+        ai_grade = (row[grade_i] or "").strip()
+        override = (row[override_i] or "").strip()
+
+        # Cheap column checks first; only rows that can still win pay for timestamp parsing
+        game_key = gtype.casefold()
+        if game_key not in game_keys or not first_name or not email:
+            continue
+        if not _is_correct(ai_grade, override):
+            continue
+        ts = _parse_dt_safe((row[ts_i] or "").strip())
+        if not ts:
+            continue
+
+        last_initial = (row[last_i] or "").strip()
         link_val = (row[link_idx] or "").strip() if (link_idx is not None and len(row) > link_idx) else ""
-        submissions.append({
-            "row": i,
-            "game": gtype,
-            "dt": ts,
-            "First Name": first_name,
-            "Last Name Initial": last_initial,
-            "Email": email,
-            "AI Grade": ai_grade,
-            "Override": override,
-            "Link": link_val,
-        })
-
-    previous_winner_emails = _load_previous_winner_emails(sheet)
-
-    winner_headers_raw = safe_get_all_values(winners_ws, "reading Winners headers")
+        name = _display_name(first_name, last_initial)
+        subs_by_game.setdefault(game_key, []).append(
+            _Submission(i, ts, email, email.casefold(), link_val, name, name.casefold())
+        )
+
+    # Only the bucketed entries are needed from here on; let the raw rows go
+    del subs_raw
+
+    # Time-order each game's entries once so every window below is a bisect slice
+    sub_times = {}
+    for key, subs in subs_by_game.items():
+        subs.sort(key=lambda s: (s.dt, s.row))
+        sub_times[key] = [s.dt for s in subs]
+
+    previous_winner_emails = _load_previous_winner_emails(data.get("Previous Winners", []))
+
+    winner_headers_raw = data.get("Winners", [])
     winner_headers = winner_headers_raw[0] if winner_headers_raw else []
     num_columns = len(winner_headers)
     wh = {name.strip(): idx for idx, name in enumerate(winner_headers)}
     has_swag_link_col = "Swag Winner Link" in wh
 
     existing_rows = winner_headers_raw
-    existing_map = {}
-    if existing_rows and len(existing_rows) >= 3:
-        wh_existing = {name.strip(): idx for idx, name in enumerate(existing_rows[0])}
-        for r in existing_rows[2:]:
-            if not r:
-                continue
-
-            def gv(col):
-                idx = wh_existing.get(col)
-                return (r[idx] if idx is not None and len(r) > idx else "").strip()
-
-            key = (gv("Start Time"), gv("End Time"), gv("Game"))
-            if any(key):
-                existing_map[key] = (gv("Swag Winner"), gv("Swag Winner Email"))
-
-    last_row = len(existing_rows)
-    if last_row >= 3:
-        last_col_letter = chr(64 + num_columns)
-        safe_update_range(
-            winners_ws,
-            f"A3:{last_col_letter}{last_row}",
-            [["" for _ in range(num_columns)] for _ in range(last_row - 2)]
-        )
+    # existing_rows[0] is the header row wh was built from
+    existing_cols = [wh.get(col) for col in ("Start Time", "End Time", "Game", "Swag Winner", "Swag Winner Email")]
+    existing_cells = (
+        [(r[idx] if idx is not None and len(r) > idx else "").strip() for idx in existing_cols]
+        for r in existing_rows[2:] if r
+    )
+    existing_map = {
+        (start, end, game): (swag, swag_email)
+        for start, end, game, swag, swag_email in existing_cells
+        if start or end or game
+    }
 
     rows_out = []
     processed_games = 0
+    rng = random.Random()
 
     for g in games:
         processed_games += 1
         if processed_games % 5 == 0:
             log(f"Processed {processed_games} games for winner calculation...")
             
-        correct_entries = []
-        for s in submissions:
-            if (s["game"] or "").strip().lower() != g["game"].strip().lower():
-                continue
-            if not s["dt"]:
-                continue
-            if g["start_dt"] <= s["dt"] <= g["end_dt"]:
-                if grading.is_marked_correct(s):
-                    if s["First Name"] and s["Email"]:
-                        correct_entries.append(s)
-
-        def display_name(e):
-            last_initial = (e.get('Last Name Initial') or "").strip()
-            if last_initial:
-                return f"{e['First Name']} {last_initial}."
-            else:
-                return e['First Name']
-
-        # Sort by display name first
-        correct_entries_sorted = sorted(correct_entries, key=lambda e: display_name(e).lower())
-
-        # De-dupe by display name
-        winners_names_sorted = []
-        winners_emails_sorted = []
-        winners_entries_sorted = []
-        seen = set()
-        for e in correct_entries_sorted:
-            n = display_name(e)
-            if n not in seen:
-                winners_names_sorted.append(n)
-                winners_emails_sorted.append((e["Email"] or "").strip())
-                winners_entries_sorted.append(e)
-                seen.add(n)
-
-        correct_entries_by_time = sorted(correct_entries, key=lambda e: e["dt"] if e["dt"] else datetime.min.replace(tzinfo=e["dt"].tzinfo if e["dt"] else None))
-        winners_ordered = []
-        seen_ordered = set()
-        for e in correct_entries_by_time:
-            n = display_name(e)
-            if n not in seen_ordered:
-                winners_ordered.append(n)
-                seen_ordered.add(n)
+        subs = subs_by_game.get(g.game_key, [])
+        times = sub_times.get(g.game_key, [])
+        correct_entries_by_time = subs[bisect_left(times, g.start_dt):bisect_right(times, g.end_dt)]
+        correct_entries = sorted(correct_entries_by_time, key=lambda s: s.row)
+
+        # De-dupe by display name (first entry in row order wins), then sort only the unique names
+        unique = {}
+        for e in correct_entries:
+            unique.setdefault(e.display_name, e)
+        winners_entries_sorted = sorted(unique.values(), key=lambda e: e.name_key)
+        winners_names_sorted = [e.display_name for e in winners_entries_sorted]
+
+        winners_ordered = list(dict.fromkeys(e.display_name for e in correct_entries_by_time))
 
         # Winner emails: alphabetize and dedupe case-insensitively
         email_map = {}
-        for em in winners_emails_sorted:
-            em_clean = (em or "").strip()
-            if not em_clean:
-                continue
-            k = em_clean.lower()
-            if k not in email_map:
-                email_map[k] = em_clean
-        winner_emails_alpha = [email_map[k] for k in sorted(email_map.keys())]
+        for e in winners_entries_sorted:
+            email_map.setdefault(e.email_key, e.email)
+        winner_emails_alpha = [em for _, em in sorted(email_map.items())]
 
         # Preserve swag winner if still valid; otherwise choose anew
         swag_name = ""
         swag_email = ""
         swag_link = ""
 
-        pairs_all = {(display_name(e), (e["Email"] or "").strip()) for e in correct_entries_sorted}
-        key_tuple = (_fmt_dt(g["start_dt"]), _fmt_dt(g["end_dt"]), g["game"])
+        pairs_all = {(e.display_name, e.email) for e in correct_entries}
+        key_tuple = (_fmt_dt(g.start_dt), _fmt_dt(g.end_dt), g.game)
         prior_swag_name, prior_swag_email = existing_map.get(key_tuple, ("", ""))
 
         if prior_swag_name and prior_swag_email:
-            if (prior_swag_name, prior_swag_email) in pairs_all and (prior_swag_email or "").strip().lower() not in previous_winner_emails:
+            if (prior_swag_name, prior_swag_email) in pairs_all and prior_swag_email.casefold() not in previous_winner_emails:
                 swag_name, swag_email = prior_swag_name, prior_swag_email
                 # fetch link for this entry
-                for e in correct_entries_sorted:
-                    if display_name(e) == swag_name and (e["Email"] or "").strip() == swag_email:
-                        swag_link = (e.get("Link") or "").strip()
+                for e in correct_entries:
+                    if e.display_name == swag_name and e.email == swag_email:
+                        swag_link = e.link.strip()
                         break
 
         if not swag_name:
-            eligible = [e for e in correct_entries_sorted if (e["Email"] or "").strip().lower() not in previous_winner_emails]
+            # The draw is made from the full name-ordered list, so duplicate entries keep their weight
+            correct_entries_sorted = sorted(correct_entries, key=lambda e: e.name_key)
+            eligible = [e for e in correct_entries_sorted if e.email_key not in previous_winner_emails]
             pool = eligible if eligible else correct_entries_sorted
             if pool:
-                choice = random.choice(pool)
-                swag_name = display_name(choice)
-                swag_email = (choice["Email"] or "").strip()
-                swag_link = (choice.get("Link") or "").strip()
+                # Seeded by the game window (str seeds hash stably across runs) so an
+                # unchanged pool draws the same winner on every rerun
+                rng.seed("|".join(key_tuple))
+                choice = rng.choice(pool)
+                swag_name = choice.display_name
+                swag_email = choice.email
+                swag_link = choice.link.strip()
 
         # Full Text
         others_names = [n for n in winners_names_sorted if n != swag_name]
@@ -260,9 +288,9 @@ def populate_winners_tab(sheet):
 
         # Map to output row
         values = {
-            "Start Time": _fmt_dt(g["start_dt"]),
-            "End Time": _fmt_dt(g["end_dt"]),
-            "Game": g["game"],
+            "Start Time": key_tuple[0],
+            "End Time": key_tuple[1],
+            "Game": g.game,
             "Swag Winner": swag_name,
             "Swag Winner Email": swag_email,
             "Winners": ", ".join(winners_names_sorted),
@@ -276,12 +304,26 @@ def populate_winners_tab(sheet):
         row_out = [values.get(col, "") for col in winner_headers]
         rows_out.append(row_out)
 
+    new_rows = len(rows_out)
+    old_rows = max(0, len(existing_rows) - 2)
+
+    # The tab was read above, so an idle rerun can be detected without a stored signature
+    # One shared blank row is enough: the rows are only compared and serialized, never mutated
+    blank_rows = [[""] * num_columns] * max(0, old_rows - new_rows)
+    current = [r[:num_columns] for r in existing_rows[2:]]
+    if old_rows >= new_rows and current == rows_out + blank_rows:
+        log(f"Winners tab already up to date ({new_rows} rows); skipping write.")
+        return
+
+    # Write the new rows and blank any leftover old ones in a single request;
+    # rows the new output covers are simply overwritten
+    last_col_letter = _col_letter(num_columns)
+    updates = []
     if rows_out:
-        last_col_letter = chr(64 + num_columns)
-        safe_update_range(
-            winners_ws,
-            f"A3:{last_col_letter}{2 + len(rows_out)}",
-            rows_out
-        )
+        updates.append({"range": f"A3:{last_col_letter}{2 + new_rows}", "values": rows_out})
+    if blank_rows:
+        updates.append({"range": f"A{3 + new_rows}:{last_col_letter}{2 + old_rows}", "values": blank_rows})
+    if updates:
+        safe_batch_update(winners_ws, updates)
 
     log(f"Successfully populated {len(rows_out)} winner rows with time windows and swag selection.")
\ No newline at end of file